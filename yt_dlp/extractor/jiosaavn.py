@@ -1,6 +1,7 @@
+import collections
+import concurrent.futures
 import functools
 import itertools
-import math
 import re
 
 from .common import InfoExtractor
@@ -12,7 +13,6 @@
     int_or_none,
     js_to_json,
     make_archive_id,
-    orderedSet,
     smuggle_url,
     unified_strdate,
     unified_timestamp,
@@ -25,36 +25,162 @@
 )
 from ..utils.traversal import traverse_obj
 
+_THUMBNAIL_SIZE_RE = re.compile(r'-\d+x\d+\.')
+
+
+def _resize_thumbnail(url):
+    # Thumbnail URLs normally end in '-<width>x<height>.<ext>'; avoid the regex in that case
+    base, _, ext = url.rpartition('.')
+    prefix, _, size = base.rpartition('-')
+    width, _, height = size.partition('x')
+    if prefix and width.isdigit() and height.isdigit():
+        return f'{prefix}-500x500.{ext}'
+    return _THUMBNAIL_SIZE_RE.sub('-500x500.', url)
+
+
+@functools.lru_cache(maxsize=256)
+def _language_code(language):
+    return ISO639Utils.short2long(language.casefold()) or 'und'
+
+
+class _PageFetcher:
+    """Page function that fetches up to ie.concurrency pages ahead while pages are requested in ascending order"""
+
+    def __init__(self, ie, fetch_func, last_page=None, first_page=None):
+        self._ie = ie
+        self._fetch_func = fetch_func
+        self._last_page = last_page
+        # Already downloaded (page number, data); only kept until it is first requested
+        self._first_page = first_page
+        self._pages = self._next_page = self._last_requested = None
+
+    def __call__(self, page):
+        going_back = self._last_requested is not None and page < self._last_requested
+        self._last_requested = page
+        if self._first_page and self._first_page[0] == page:
+            _, result = self._first_page
+            self._first_page = None
+            return result
+        if page != self._next_page:
+            self.close()
+            # Fetching ahead would only re-request pages already seen, e.g. with --playlist-reverse
+            if going_back:
+                return self._fetch_func(page)
+            self._pages = self._ie._fetch_ahead(self._fetch_func, (
+                itertools.count(page) if self._last_page is None else range(page, self._last_page + 1)))
+        # Start over on the next call if this page fails
+        self._next_page = None
+        result = next(self._pages)
+        if page == self._last_page:
+            self.close()
+        else:
+            self._next_page = page + 1
+        return result
+
+    def close(self):
+        """Stop fetching ahead and wait for any in-flight request"""
+        if self._pages:
+            self._pages.close()
+        self._pages = self._next_page = None
+
 
 class JioSaavnBaseIE(InfoExtractor):
     _URL_BASE_RE = r'https?://(?:www\.)?(?:jio)?saavn\.com'
     _API_URL = 'https://www.jiosaavn.com/api.php'
-    _VALID_BITRATES = {'16', '32', '64', '128', '320'}
+    _SORTED_BITRATES = ('16', '32', '64', '128', '320')
+    _VALID_BITRATES = frozenset(_SORTED_BITRATES)
+    _SONG_SPEC = {
+        'id': ('id', {str}),
+        'title': (('song', 'title'), {clean_html}, any),
+        'album': ((None, 'more_info'), 'album', {clean_html}, any),
+        'duration': ((None, 'more_info'), 'duration', {int_or_none}, any),
+        'channel': ((None, 'more_info'), 'label', {str}, any),
+        'channel_id': ((None, 'more_info'), 'label_id', {str}, any),
+        'channel_url': ((None, 'more_info'), 'label_url', {urljoin('https://www.jiosaavn.com/')}, any),
+        'release_date': ((None, 'more_info'), 'release_date', {unified_strdate}, any),
+        'release_year': ('year', {int_or_none}),
+        'thumbnail': ('image', {url_or_none}, {_resize_thumbnail}),
+        'view_count': ('play_count', {int_or_none}),
+        'language': ('language', {str}, {_language_code}),
+        'webpage_url': ('perma_url', {url_or_none}),
+        'artists': ((
+            ('more_info', 'artistMap', 'primary_artists', ..., 'name'),
+            (('primary_artists', 'featured_artists'), {str}, {lambda x: x.split(', ')}, ...),
+        ), {str}, filter, all),
+    }
+    _EPISODE_SPEC = {
+        'description': ('more_info', 'description', {str}),
+        'timestamp': ('more_info', 'release_time', {unified_timestamp}),
+        'series': ('more_info', 'show_title', {str}),
+        'series_id': ('more_info', 'show_id', {str}),
+        'season': ('more_info', 'season_title', {str}),
+        'season_number': ('more_info', 'season_no', {int_or_none}),
+        'season_id': ('more_info', 'season_id', {str}),
+        'episode_number': ('more_info', 'episode_number', {int_or_none}),
+        'cast': ('starring', {lambda x: x.split(', ') if x else None}),
+    }
 
     @functools.cached_property
     def requested_bitrates(self):
         requested_bitrates = self._configuration_arg('bitrate', ['128', '320'], ie_key='JioSaavn')
-        if invalid_bitrates := set(requested_bitrates) - self._VALID_BITRATES:
+        if not self._VALID_BITRATES.issuperset(requested_bitrates):
+            invalid_bitrates = [bitrate for bitrate in requested_bitrates if bitrate not in self._VALID_BITRATES]
             raise ValueError(
                 f'Invalid bitrate(s): {", ".join(invalid_bitrates)}. '
-                f'Valid bitrates are: {", ".join(sorted(self._VALID_BITRATES, key=int))}')
+                f'Valid bitrates are: {", ".join(self._SORTED_BITRATES)}')
         return requested_bitrates
 
+    @functools.cached_property
+    def concurrency(self):
+        concurrency = self._configuration_arg('concurrency', ['1'], ie_key='JioSaavn')[0]
+        if not (int_or_none(concurrency) or 0) > 0:
+            raise ValueError(f'Invalid concurrency: {concurrency}. Must be a positive integer')
+        # Each worker thread would sleep independently, defeating --sleep-requests
+        if int(concurrency) > 1 and self.get_param('sleep_interval_requests'):
+            self.report_warning('Ignoring concurrency since --sleep-requests is set')
+            return 1
+        return int(concurrency)
+
+    def _fetch_ahead(self, fetch_func, keys, max_workers=None):
+        """Generate fetch_func(key) for each key in order, running up to self.concurrency calls ahead"""
+        workers = min(self.concurrency, max_workers or self.concurrency)
+        if workers == 1:
+            yield from map(fetch_func, keys)
+            return
+
+        keys = iter(keys)
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            futures = collections.deque(
+                executor.submit(fetch_func, key) for key in itertools.islice(keys, workers))
+            try:
+                while futures:
+                    result = futures.popleft().result()
+                    futures.extend(executor.submit(fetch_func, key) for key in itertools.islice(keys, 1))
+                    yield result
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _download_format_info(self, item_data, bitrate):
+        return self._download_json(
+            self._API_URL, item_data['id'],
+            f'Downloading format info for {bitrate}',
+            fatal=False, data=urlencode_postdata({
+                '__call': 'song.generateAuthToken',
+                '_format': 'json',
+                'bitrate': bitrate,
+                'url': item_data['encrypted_media_url'],
+            }))
+
     def _extract_formats(self, item_data):
         # Show/episode JSON data has a slightly different structure than song JSON data
         if media_url := traverse_obj(item_data, ('more_info', 'encrypted_media_url', {str})):
             item_data.setdefault('encrypted_media_url', media_url)
 
-        for bitrate in self.requested_bitrates:
-            media_data = self._download_json(
-                self._API_URL, item_data['id'],
-                f'Downloading format info for {bitrate}',
-                fatal=False, data=urlencode_postdata({
-                    '__call': 'song.generateAuthToken',
-                    '_format': 'json',
-                    'bitrate': bitrate,
-                    'url': item_data['encrypted_media_url'],
-                }))
+        format_infos = self._fetch_ahead(
+            functools.partial(self._download_format_info, item_data),
+            self.requested_bitrates, max_workers=len(self.requested_bitrates))
+        for bitrate, media_data in zip(self.requested_bitrates, format_infos, strict=True):
             if not traverse_obj(media_data, ('auth_url', {url_or_none})):
                 self.report_warning(f'Unable to extract format info for {bitrate}')
                 continue
@@ -82,31 +208,12 @@ def _call_api(self, type_, token, note='API', params={}):
 
     @staticmethod
     def _extract_song(song_data, url=None):
-        info = traverse_obj(song_data, {
-            'id': ('id', {str}),
-            'title': (('song', 'title'), {clean_html}, any),
-            'album': ((None, 'more_info'), 'album', {clean_html}, any),
-            'duration': ((None, 'more_info'), 'duration', {int_or_none}, any),
-            'channel': ((None, 'more_info'), 'label', {str}, any),
-            'channel_id': ((None, 'more_info'), 'label_id', {str}, any),
-            'channel_url': ((None, 'more_info'), 'label_url', {urljoin('https://www.jiosaavn.com/')}, any),
-            'release_date': ((None, 'more_info'), 'release_date', {unified_strdate}, any),
-            'release_year': ('year', {int_or_none}),
-            'thumbnail': ('image', {url_or_none}, {lambda x: re.sub(r'-\d+x\d+\.', '-500x500.', x)}),
-            'view_count': ('play_count', {int_or_none}),
-            'language': ('language', {lambda x: ISO639Utils.short2long(x.casefold()) or 'und'}),
-            'webpage_url': ('perma_url', {url_or_none}),
-            'artists': ('more_info', 'artistMap', 'primary_artists', ..., 'name', {str}, filter, all),
-        })
+        info = traverse_obj(song_data, JioSaavnBaseIE._SONG_SPEC)
         if webpage_url := info.get('webpage_url') or url:
             info['display_id'] = url_basename(webpage_url)
             info['_old_archive_ids'] = [make_archive_id(JioSaavnSongIE, info['display_id'])]
 
-        if primary_artists := traverse_obj(song_data, ('primary_artists', {lambda x: x.split(', ') if x else None})):
-            info['artists'].extend(primary_artists)
-        if featured_artists := traverse_obj(song_data, ('featured_artists', {str}, filter)):
-            info['artists'].extend(featured_artists.split(', '))
-        info['artists'] = orderedSet(info['artists']) or None
+        info['artists'] = list(dict.fromkeys(info['artists'])) or None
 
         return info
 
@@ -114,17 +221,7 @@ def _extract_song(song_data, url=None):
     def _extract_episode(episode_data, url=None):
         info = JioSaavnBaseIE._extract_song(episode_data, url)
         info.pop('_old_archive_ids', None)
-        info.update(traverse_obj(episode_data, {
-            'description': ('more_info', 'description', {str}),
-            'timestamp': ('more_info', 'release_time', {unified_timestamp}),
-            'series': ('more_info', 'show_title', {str}),
-            'series_id': ('more_info', 'show_id', {str}),
-            'season': ('more_info', 'season_title', {str}),
-            'season_number': ('more_info', 'season_no', {int_or_none}),
-            'season_id': ('more_info', 'season_id', {str}),
-            'episode_number': ('more_info', 'episode_number', {int_or_none}),
-            'cast': ('starring', {lambda x: x.split(', ') if x else None}),
-        }))
+        info.update(traverse_obj(episode_data, JioSaavnBaseIE._EPISODE_SPEC))
         return info
 
     def _extract_jiosaavn_result(self, url, endpoint, response_key, parse_func):
@@ -306,17 +403,18 @@ def _fetch_page(self, token, page):
         return self._call_api(
             'playlist', token, f'playlist page {page}', {'p': page, 'n': self._PAGE_SIZE})
 
-    def _entries(self, token, first_page_data, page):
-        page_data = first_page_data if not page else self._fetch_page(token, page + 1)
-        yield from self._yield_items(page_data, 'songs')
+    def _entries(self, fetch_page, page):
+        yield from self._yield_items(fetch_page(page + 1), 'songs')
 
     def _real_extract(self, url):
         display_id = self._match_id(url)
         playlist_data = self._fetch_page(display_id, 1)
-        total_pages = math.ceil(int(playlist_data['list_count']) / self._PAGE_SIZE)
+        total_pages = (int(playlist_data['list_count']) + self._PAGE_SIZE - 1) // self._PAGE_SIZE
+        fetch_page = _PageFetcher(
+            self, functools.partial(self._fetch_page, display_id), total_pages, first_page=(1, playlist_data))
 
         return self.playlist_result(InAdvancePagedList(
-            functools.partial(self._entries, display_id, playlist_data),
+            functools.partial(self._entries, fetch_page),
             total_pages, self._PAGE_SIZE), display_id, traverse_obj(playlist_data, ('listname', {str})))
 
 
@@ -344,9 +442,12 @@ def _fetch_page(self, show_id, season_id, page):
             'sort_order': 'desc',
         })
 
-    def _entries(self, show_id, season_id, page):
-        page_data = self._fetch_page(show_id, season_id, page + 1)
-        yield from self._yield_items(page_data, keys=None, parse_func=self._extract_episode)
+    def _entries(self, fetch_page, page):
+        entries = list(self._yield_items(fetch_page(page + 1), keys=None, parse_func=self._extract_episode))
+        # OnDemandPagedList stops at the first short page, so stop fetching ahead as well
+        if len(entries) < self._PAGE_SIZE:
+            fetch_page.close()
+        yield from entries
 
     def _real_extract(self, url):
         show_slug, season_id = self._match_valid_url(url).group('show', 'season')
@@ -358,7 +459,8 @@ def _real_extract(self, url):
             playlist_id, transform_source=js_to_json)['showView']
         show_id = show_info['current_id']
 
-        entries = OnDemandPagedList(functools.partial(self._entries, show_id, season_id), self._PAGE_SIZE)
+        fetch_page = _PageFetcher(self, functools.partial(self._fetch_page, show_id, season_id))
+        entries = OnDemandPagedList(functools.partial(self._entries, fetch_page), self._PAGE_SIZE)
         return self.playlist_result(
             entries, playlist_id, traverse_obj(show_info, ('show', 'title', 'text', {str})))
 
@@ -397,11 +499,19 @@ def _fetch_page(self, artist_id, page):
         })
 
     def _entries(self, artist_id, first_page):
-        for page in itertools.count():
-            playlist_data = first_page if not page else self._fetch_page(artist_id, page)
-            if not traverse_obj(playlist_data, ('topSongs', ..., {dict})):
-                break
-            yield from self._yield_items(playlist_data, 'topSongs')
+        if not traverse_obj(first_page, ('topSongs', ..., {dict})):
+            return
+        yield from self._yield_items(first_page, 'topSongs')
+        # Do not keep the first page alive for the rest of the walk
+        del first_page
+        next_pages = self._fetch_ahead(functools.partial(self._fetch_page, artist_id), itertools.count(1))
+        try:
+            for playlist_data in next_pages:
+                if not traverse_obj(playlist_data, ('topSongs', ..., {dict})):
+                    break
+                yield from self._yield_items(playlist_data, 'topSongs')
+        finally:
+            next_pages.close()
 
     def _real_extract(self, url):
         artist_id = self._match_id(url)